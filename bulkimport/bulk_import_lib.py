@@ -1,13 +1,16 @@
 # bulk_import_lib.py  — URL-only images (no uploads to Supabase Storage)
 
-import os, csv, time, mimetypes
+import os, re, csv, time, zlib, mimetypes, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, Any, List, Optional, Tuple
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlunparse
 
 import requests, filetype
 from slugify import slugify
 from supabase import create_client, Client
 
+from desc_cache import DescriptionCache
+
 # ---------------------------
 # Supabase client
 # ---------------------------
@@ -163,6 +166,80 @@ def verify_remote_image_url(src: str, logs: List[str], timeout: int = 20) -> Opt
 
     return None
 
+def verify_remote_image_url_cached(src: str, logs: List[str],
+                                   url_cache: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """
+    verify_remote_image_url, remembering successes in 'url_cache' (one dict per
+    import; rows often share images/variants). Failures are not cached, so a
+    transient timeout is retried on the next row that uses the URL.
+    """
+    if url_cache is not None and src in url_cache:
+        logs.append(f"[image:url] cached check for {src}")
+        return url_cache[src]
+    final = verify_remote_image_url(src, logs)
+    if final and url_cache is not None:
+        url_cache[src] = final
+    return final
+
+# ---------------------------
+# Responsive variants for known CDN URLs
+# ---------------------------
+# Column that receives {"base", "thumbnail", "card", "full"}; unset = don't write variants
+IMAGE_VARIANTS_COLUMN = os.getenv("IMAGE_VARIANTS_COLUMN", "")
+IMAGE_VARIANT_WIDTHS = {"thumbnail": 240, "card": 600, "full": 1200}
+
+# Shopify CDN: <store>/cdn/shop/... or cdn.shopify.com/s/files/..., with an
+# optional size suffix before the extension, e.g. Untitled-3_1524x.png or
+# photo_1524x1524_crop_center@2x.jpg. Legacy named sizes (_medium, _large, ...)
+# are not stripped: they are indistinguishable from real file names.
+SHOPIFY_CDN_PATH_RE = re.compile(
+    r"^(?P<stem>/(?:cdn/shop|s/files)/.+?)"
+    r"(?:_(?:\d+x\d*|x\d+)(?:_crop_(?:top|center|bottom|left|right))?(?:@\d+x)?)?"
+    r"(?P<ext>\.(?:jpe?g|png|gif|webp|avif))$",
+    re.IGNORECASE,
+)
+
+def cdn_image_variants(src: str) -> Optional[Dict[str, str]]:
+    """
+    If 'src' is a known CDN image URL, return its size-free base URL plus one
+    URL per IMAGE_VARIANT_WIDTHS entry (query string such as ?v= is kept).
+    Returns None for URLs we don't know how to resize.
+    """
+    u = urlparse(src)
+    m = SHOPIFY_CDN_PATH_RE.match(u.path or "")
+    if not m:
+        return None
+    stem, ext = m.group("stem"), m.group("ext")
+    out = {"base": urlunparse(u._replace(path=f"{stem}{ext}"))}
+    for name, width in IMAGE_VARIANT_WIDTHS.items():
+        out[name] = urlunparse(u._replace(path=f"{stem}_{width}x{ext}"))
+    return out
+
+def verified_image_variants(src: str, logs: List[str],
+                            url_cache: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Known-CDN variants of 'src' that pass the (cached) reachability check.
+    'base' falls back to 'src' itself if the size-free URL doesn't resolve.
+    """
+    variants = cdn_image_variants(src)
+    if not variants:
+        return {}
+    base = variants.pop("base")
+    out = {"base": src}
+    if base != src:
+        final = verify_remote_image_url_cached(base, logs, url_cache)
+        if final:
+            out["base"] = final
+        else:
+            logs.append(f"[image:variants] base unavailable, keeping original: {base}")
+    for name, url in variants.items():
+        final = verify_remote_image_url_cached(url, logs, url_cache)
+        if final:
+            out[name] = final
+        else:
+            logs.append(f"[image:variants] {name} unavailable, skipping: {url}")
+    return out
+
 # ---------------------------
 # URL-only image "upload"
 # ---------------------------
@@ -172,12 +249,17 @@ def upload_image_if_any(
     base_url: str,           # kept for signature compatibility (unused)
     src: Optional[str],
     prefix: str,
-    logs: List[str]
+    logs: List[str],
+    variants_out: Optional[Dict[str, str]] = None,
+    url_cache: Optional[Dict[str, str]] = None,
 ) -> Optional[str]:
     """
     URL-ONLY MODE:
     - If 'src' is an HTTP/HTTPS URL, validate and return the (possibly redirected) URL.
     - If 'src' is a local path, skip (no upload) and return None.
+    - If 'variants_out' is given and 'src' is a known CDN URL, it is filled with
+      the normalized base URL and thumbnail/card/full size variants.
+    - 'url_cache' (one dict per import) skips re-checking URLs that already passed.
     """
     if not src:
         return None
@@ -187,7 +269,9 @@ def upload_image_if_any(
         return None
 
     if is_url(src):
-        final = verify_remote_image_url(src, logs)
+        if variants_out is not None:
+            variants_out.update(verified_image_variants(src, logs, url_cache))
+        final = verify_remote_image_url_cached(src, logs, url_cache)
         if final:
             return final
         # If validation fails, keep the original URL (optional: comment the next two lines to return None instead)
@@ -200,6 +284,35 @@ def upload_image_if_any(
 # ---------------------------
 # CSV & coercions
 # ---------------------------
+# Column that receives the HTML-free description text; unset = don't write it.
+# 'description' itself is always stored as given (the storefront renders it as HTML).
+DESCRIPTION_TEXT_COLUMN = os.getenv("DESCRIPTION_TEXT_COLUMN", "")
+_DESC_CACHE: Optional[DescriptionCache] = None
+
+def desc_cache() -> DescriptionCache:
+    global _DESC_CACHE
+    if _DESC_CACHE is None:
+        _DESC_CACHE = DescriptionCache()
+    return _DESC_CACHE
+
+def description_text(desc: Optional[str]) -> Optional[str]:
+    """
+    Plain-text form of a description/body_html for DESCRIPTION_TEXT_COLUMN,
+    converted once per distinct body through the shared description cache.
+    """
+    if not desc:
+        return None
+    return desc_cache().html_to_text(desc) or None
+
+def flush_desc_cache(logs: List[str]):
+    if _DESC_CACHE is None or not (_DESC_CACHE.hits + _DESC_CACHE.misses or _DESC_CACHE.new_entries()):
+        return
+    logs.append(f"[desc-cache] {_DESC_CACHE.stats()}")
+    try:
+        _DESC_CACHE.save()
+    except Exception as e:
+        logs.append(f"[desc-cache] save failed: {e}")
+
 def read_csv_bytes(b: bytes) -> List[Dict[str, str]]:
     text = b.decode("utf-8-sig")
     rows = []
@@ -214,25 +327,98 @@ def clean_image_src(s: Optional[str]) -> Optional[str]:
     if not s: return None
     return s.strip().strip('"').strip("'") or None
 
+# ---------------------------
+# Duplicate-row coalescing
+# ---------------------------
+LABEL_COLUMNS = ("collection_slugs", "collections", "collection", "product_type")
+
+def coalesce_rows(rows: List[Dict[str, str]], key_fn, kind: str, logs: List[str],
+                  merge_labels: bool = False) -> List[Dict[str, str]]:
+    """
+    Collapse rows that resolve to the same slug into one row (first-seen order).
+    Per field, the last non-empty value wins and each differing value is logged
+    as a conflict. Empty values in later copies are ignored: unlike writing every
+    copy in turn, a later copy's blank description/tags no longer clears the field.
+    With 'merge_labels', the collection labels of all copies are unioned into
+    'collection_slugs'.
+    Rows without a key (e.g. empty name) pass through untouched.
+    """
+    groups: Dict[str, List[Dict[str, str]]] = {}
+    out: List[Any] = []
+    for r in rows:
+        key = key_fn(r)
+        if not key:
+            out.append(r)
+            continue
+        if key not in groups:
+            groups[key] = []
+            out.append(key)
+        groups[key].append(r)
+
+    dupes = conflicted = 0
+    for key, group in groups.items():
+        if len(group) == 1:
+            continue
+        dupes += 1
+        merged = dict(group[0])
+        conflicts: List[str] = []
+        for r in group[1:]:
+            for k, v in r.items():
+                if not v:
+                    continue
+                if merge_labels and k in LABEL_COLUMNS:
+                    continue
+                if merged.get(k) and merged[k] != v:
+                    conflicts.append(f"{k} ({merged[k]!r} -> {v!r})")
+                merged[k] = v
+        if merge_labels:
+            labels: Dict[str, str] = {}
+            for r in group:
+                for lab in read_raw_collection_labels(r):
+                    labels.setdefault(slugify(lab), lab)
+            if labels:
+                merged["collection_slugs"] = ",".join(labels.values())
+        groups[key] = [merged]
+        if conflicts:
+            conflicted += 1
+            logs.append(f"[dedupe] {kind} '{key}': {len(group)} rows merged, conflicts: {'; '.join(conflicts)}")
+        else:
+            logs.append(f"[dedupe] {kind} '{key}': {len(group)} identical rows merged")
+
+    result = [groups[x][0] if isinstance(x, str) else x for x in out]
+    if dupes:
+        logs.append(f"[dedupe] {kind}: {len(rows)} rows -> {len(result)} ({dupes} duplicated slug(s), {conflicted} with conflicts)")
+    return result
+
 # ---------------------------
 # Collections upsert
 # ---------------------------
+def collection_slug(r: Dict[str, str]) -> str:
+    return r.get("slug", "").strip() or slugify(r.get("name", "").strip())
+
 def ensure_collections(supabase: Client, bucket: str, base_url: str,
                        collection_rows: List[Dict[str, str]], dry_run: bool,
                        logs: List[str]):
     created = updated = 0
+    url_cache: Dict[str, str] = {}  # image checks that passed during this import
+    collection_rows = coalesce_rows(
+        collection_rows, lambda r: collection_slug(r) if r.get("name", "").strip() else "", "collection", logs
+    )
     for r in collection_rows:
         name = r.get("name", "").strip()
         if not name:
             logs.append(f"skip collection row with empty name: {r}")
             continue
-        slug_in = r.get("slug", "").strip() or slugify(name)
+        slug_in = collection_slug(r)
         desc = (r.get("description") or "").strip() or None
         image_src = clean_image_src(r.get("image") or r.get("image_url") or r.get("image_origin_url"))
 
         image_url = None
+        variants: Dict[str, str] = {}
         if image_src and not dry_run:
-            image_url = upload_image_if_any(supabase, bucket, base_url, image_src, "collections", logs)
+            image_url = upload_image_if_any(supabase, bucket, base_url, image_src, "collections", logs,
+                                            variants_out=variants if IMAGE_VARIANTS_COLUMN else None,
+                                            url_cache=url_cache)
             time.sleep(0.05)
 
         if dry_run:
@@ -245,11 +431,15 @@ def ensure_collections(supabase: Client, bucket: str, base_url: str,
             upd = {"name": name, "description": desc}
             if image_url:
                 upd["image_url"] = image_url
+            if variants:
+                upd[IMAGE_VARIANTS_COLUMN] = variants
             supabase.table("collections").update(upd).eq("id", rec_id).execute()
             updated += 1
             logs.append(f"updated collection: {slug_in} (id={rec_id})")
         else:
             ins = {"name": name, "slug": slug_in, "description": desc, "image_url": image_url}
+            if variants:
+                ins[IMAGE_VARIANTS_COLUMN] = variants
             res = supabase.table("collections").insert(ins).execute()
             rec_id = (res.data or [{}])[0].get("id")
             created += 1
@@ -260,38 +450,32 @@ def ensure_collections(supabase: Client, bucket: str, base_url: str,
 # ---------------------------
 # Products upsert (+ link to collections)
 # ---------------------------
-def upsert_products(
-    supabase: Client,
-    bucket: str,
-    base_url: str,
-    product_rows: List[Dict[str, str]],
-    dry_run: bool,
-    logs: List[str],
-):
-    """
-    Bulk upsert products and link to collections using collection slugs from CSV.
+def read_raw_collection_labels(r: Dict[str, str]) -> List[str]:
+    val = (
+        r.get("collection_slugs") or  # <--- PLURAL (preferred)
+        r.get("collections") or
+        r.get("collection") or
+        r.get("product_type") or
+        ""
+    )
+    return [x.strip() for x in str(val).split(",") if x.strip()]
 
-    CSV columns honored (in order of precedence for linking):
-      - collection_slugs     <-- preferred; comma-separated slugs
-      - collections
-      - collection
-      - product_type
+def product_name(r: Dict[str, str]) -> str:
+    return (r.get("name") or r.get("title") or "").strip()
 
-    We slugify every label so either slugs or names will match your collections.slug.
-    """
-    p_created = p_updated = links = 0
+def product_slug(r: Dict[str, str]) -> str:
+    return r.get("slug", "").strip() or slugify(product_name(r))
 
-    # -------- 1) Collect all collection slugs we will need (once) ----------
-    def read_raw_collection_labels(r: Dict[str, str]) -> List[str]:
-        val = (
-            r.get("collection_slugs") or  # <--- PLURAL (preferred)
-            r.get("collections") or
-            r.get("collection") or
-            r.get("product_type") or
-            ""
-        )
-        return [x.strip() for x in str(val).split(",") if x.strip()]
+def product_key(r: Dict[str, str]) -> str:
+    """Slug for grouping/sharding; '' for rows that will be skipped (no name)."""
+    return product_slug(r) if product_name(r) else ""
 
+def preload_collection_index(supabase: Client, product_rows: List[Dict[str, str]],
+                             logs: List[str]) -> Dict[str, str]:
+    """
+    Collect every collection slug the rows link to and fetch their ids once.
+    Returns slug -> collection id.
+    """
     all_needed_slugs: set[str] = set()
     for r in product_rows:
         for lab in read_raw_collection_labels(r):
@@ -299,7 +483,6 @@ def upsert_products(
             if s:
                 all_needed_slugs.add(s)
 
-    # Preload all collections once
     slug_to_id: Dict[str, str] = {}
     if all_needed_slugs:
         try:
@@ -312,6 +495,47 @@ def upsert_products(
                     slug_to_id[row["slug"]] = row["id"]
         except Exception as e:
             logs.append(f"[link] ERROR preloading collections: {e}")
+    return slug_to_id
+
+def upsert_products(
+    supabase: Client,
+    bucket: str,
+    base_url: str,
+    product_rows: List[Dict[str, str]],
+    dry_run: bool,
+    logs: List[str],
+    slug_to_id: Optional[Dict[str, str]] = None,
+    progress: Optional[Dict[str, int]] = None,
+    save_desc_cache: bool = True,
+):
+    """
+    Bulk upsert products and link to collections using collection slugs from CSV.
+
+    CSV columns honored (in order of precedence for linking):
+      - collection_slugs     <-- preferred; comma-separated slugs
+      - collections
+      - collection
+      - product_type
+
+    We slugify every label so either slugs or names will match your collections.slug.
+    Pass 'slug_to_id' to reuse an already loaded collection index (see preload_collection_index).
+    If 'progress' is given it is kept current (created/updated/links), so callers
+    still know what was written when a later row raises.
+    Worker processes pass save_desc_cache=False and hand their new description
+    cache entries to the parent, which saves the file once.
+    """
+    p_created = p_updated = links = 0
+    if progress is None:
+        progress = {}
+    progress.update(created=0, updated=0, links=0)
+    url_cache: Dict[str, str] = {}  # image checks that passed during this import
+
+    # -------- 0) One row per slug (merged exports repeat products) ----------
+    product_rows = coalesce_rows(product_rows, product_key, "product", logs, merge_labels=True)
+
+    # -------- 1) Collect all collection slugs we will need (once) ----------
+    if slug_to_id is None:
+        slug_to_id = preload_collection_index(supabase, product_rows, logs)
 
     def resolve_collection_ids_for_row(r: Dict[str, str]) -> List[str]:
         out: List[str] = []
@@ -328,13 +552,14 @@ def upsert_products(
 
     # -------- 2) Upsert products and link --------
     for r in product_rows:
-        name = (r.get("name") or r.get("title") or "").strip()
+        name = product_name(r)
         if not name:
             logs.append(f"[prod] skip row with empty name: {r}")
             continue
 
-        slug_in = (r.get("slug", "").strip() or slugify(name))
+        slug_in = product_slug(r)
         desc = (r.get("description") or r.get("body_html") or "").strip() or None
+        desc_text = description_text(desc) if DESCRIPTION_TEXT_COLUMN else None
 
         # price_inr (numeric)
         try:
@@ -364,8 +589,11 @@ def upsert_products(
         # image URL (URL-only)
         image_src = (r.get("image") or r.get("image_url") or r.get("image_origin_url") or "").strip().strip('"').strip("'")
         image_url = None
+        variants: Dict[str, str] = {}
         if image_src and not dry_run:
-            image_url = upload_image_if_any(supabase, bucket, base_url, image_src, "products", logs)
+            image_url = upload_image_if_any(supabase, bucket, base_url, image_src, "products", logs,
+                                            variants_out=variants if IMAGE_VARIANTS_COLUMN else None,
+                                            url_cache=url_cache)
             time.sleep(0.01)
 
         # resolve collections for this row
@@ -389,10 +617,15 @@ def upsert_products(
             }
             if compare_at_price_inr is not None:
                 upd["compare_at_price_inr"] = compare_at_price_inr
+            if desc_text:
+                upd[DESCRIPTION_TEXT_COLUMN] = desc_text
             if image_url:
                 upd["image_url"] = image_url
+            if variants:
+                upd[IMAGE_VARIANTS_COLUMN] = variants
             supabase.table("products").update(upd).eq("id", pid).execute()
             p_updated += 1
+            progress["updated"] = p_updated
             logs.append(f"[prod] updated: {slug_in} (id={pid})")
         else:
             ins = {
@@ -407,9 +640,14 @@ def upsert_products(
             }
             if compare_at_price_inr is not None:
                 ins["compare_at_price_inr"] = compare_at_price_inr
+            if desc_text:
+                ins[DESCRIPTION_TEXT_COLUMN] = desc_text
+            if variants:
+                ins[IMAGE_VARIANTS_COLUMN] = variants
             res = supabase.table("products").insert(ins).execute()
             pid = (res.data or [{}])[0].get("id")
             p_created += 1
+            progress["created"] = p_created
             logs.append(f"[prod] created: {slug_in} (id={pid})")
 
         # Always re-get ID (robust)
@@ -427,11 +665,96 @@ def upsert_products(
             if batch:
                 supabase.table("product_collections").insert(batch).execute()
                 links += len(batch)
+                progress["links"] = links
                 logs.append(f"[link] added {len(batch)} link(s) for '{slug_in}'")
             else:
                 logs.append(f"[link] no new links (already linked) for '{slug_in}'")
 
         time.sleep(0.01)
 
+    if save_desc_cache:
+        flush_desc_cache(logs)
+
+    logs.append(f"[summary] products created={p_created}, updated={p_updated}, links_added={links}")
+    return p_created, p_updated, links
+
+# ---------------------------
+# Parallel (sharded) products upsert
+# ---------------------------
+def _upsert_products_shard(args: Tuple) -> Tuple[int, int, int, List[str], bool, Dict[str, str]]:
+    """
+    Process-pool entry point: one client per worker, read-only collection index.
+    Never raises: a failing shard returns what it wrote so far plus an ERROR line.
+    """
+    shard_no, supabase_url, service_key, bucket, base_url, rows, dry_run, slug_to_id = args
+    logs: List[str] = []
+    progress: Dict[str, int] = {"created": 0, "updated": 0, "links": 0}
+    failed = False
+    try:
+        supabase = make_client(supabase_url, service_key)
+        upsert_products(
+            supabase, bucket, base_url, rows, dry_run, logs,
+            slug_to_id=slug_to_id, progress=progress, save_desc_cache=False,
+        )
+    except Exception as e:
+        logs.append(f"ERROR: {e}")
+        failed = True
+    if _DESC_CACHE is not None and _DESC_CACHE.hits + _DESC_CACHE.misses:
+        logs.append(f"[desc-cache] {_DESC_CACHE.stats()}")
+    new_descs = _DESC_CACHE.new_entries() if _DESC_CACHE is not None else {}
+    return (progress["created"], progress["updated"], progress["links"],
+            [f"[shard {shard_no}] {x}" for x in logs], failed, new_descs)
+
+def upsert_products_parallel(
+    supabase: Client,
+    supabase_url: str,
+    service_key: str,
+    bucket: str,
+    base_url: str,
+    product_rows: List[Dict[str, str]],
+    dry_run: bool,
+    logs: List[str],
+    workers: int,
+):
+    """
+    Same result as upsert_products, but rows are split by slug hash across a
+    process pool. All rows for one slug land in the same shard, so a slug is
+    never inserted twice. Run ensure_collections before this: the collection
+    index is loaded once here and shipped to every worker.
+
+    Workers are spawned (not forked from the server process). Every shard's
+    counters and logs are merged before a failed shard is reported by raising.
+    """
+    workers = max(1, workers)
+    product_rows = coalesce_rows(product_rows, product_key, "product", logs, merge_labels=True)
+    slug_to_id = preload_collection_index(supabase, product_rows, logs)
+
+    shards: List[List[Dict[str, str]]] = [[] for _ in range(workers)]
+    for r in product_rows:
+        # crc32 is stable across processes (unlike hash() with PYTHONHASHSEED)
+        shards[zlib.crc32(product_slug(r).encode("utf-8")) % workers].append(r)
+
+    jobs = [
+        (i, supabase_url, service_key, bucket, base_url, rows, dry_run, slug_to_id)
+        for i, rows in enumerate(shards) if rows
+    ]
+    logs.append(f"[parallel] {len(product_rows)} product rows over {len(jobs)} worker(s)")
+
+    p_created = p_updated = links = failed = 0
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(jobs) or 1, mp_context=ctx) as pool:
+        for created, updated, linked, shard_logs, shard_failed, new_descs in pool.map(_upsert_products_shard, jobs):
+            p_created += created
+            p_updated += updated
+            links += linked
+            failed += shard_failed
+            logs.extend(shard_logs)
+            if new_descs:
+                desc_cache().merge(new_descs)
+
+    flush_desc_cache(logs)
+
     logs.append(f"[summary] products created={p_created}, updated={p_updated}, links_added={links}")
-    return p_created, p_updated, links
\ No newline at end of file
+    if failed:
+        raise RuntimeError(f"{failed} of {len(jobs)} product shard(s) failed; see [shard N] ERROR lines")
+    return p_created, p_updated, links
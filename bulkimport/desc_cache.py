@@ -0,0 +1,88 @@
+# desc_cache.py — content-addressed cache for HTML -> plain-text descriptions
+
+import os, re, json, hashlib, tempfile
+from typing import Dict
+
+DESC_CACHE_PATH = os.getenv("DESC_CACHE_PATH", "desc_cache.json")
+
+def clean_ws(s: str) -> str:
+    s = (s or "").strip()
+    s = re.sub(r"\s+", " ", s)
+    return s
+
+def _html_to_text(html: str) -> str:
+    from bs4 import BeautifulSoup  # only needed on a cache miss
+
+    soup = BeautifulSoup(str(html), "lxml")
+    for bad in soup.find_all(["script", "style", "noscript"]):
+        bad.decompose()
+    return clean_ws(soup.get_text(" ", strip=True))
+
+class DescriptionCache:
+    """
+    sha256(raw HTML) -> normalized text, persisted as JSON between runs.
+    Identical bodies (e.g. size variants of one product) are parsed once.
+    """
+
+    def __init__(self, path: str = DESC_CACHE_PATH):
+        self.path = path
+        self.hits = self.misses = 0
+        self._new: Dict[str, str] = {}  # entries added since load (what save() contributes)
+        self._data: Dict[str, str] = self._load()
+
+    def _load(self) -> Dict[str, str]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}  # corrupt/partial file: start over
+
+    def html_to_text(self, html: str) -> str:
+        raw = str(html or "")
+        key = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        text = self._data.get(key)
+        if text is not None:
+            self.hits += 1
+            return text
+        self.misses += 1
+        text = _html_to_text(raw)
+        self._data[key] = text
+        self._new[key] = text
+        return text
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = (self.hits / total) if total else 0.0
+        return f"hits={self.hits} misses={self.misses} hit_rate={rate:.1%} entries={len(self._data)}"
+
+    def new_entries(self) -> Dict[str, str]:
+        """Entries converted in this process, e.g. to hand back from a worker."""
+        return dict(self._new)
+
+    def merge(self, entries: Dict[str, str]):
+        """Adopt entries converted elsewhere (worker processes) so save() keeps them."""
+        for key, text in entries.items():
+            if key not in self._data:
+                self._data[key] = text
+                self._new[key] = text
+
+    def save(self):
+        """
+        Re-read the file and add our new entries to it, so runs that saved in the
+        meantime aren't overwritten. Written atomically (temp file + rename).
+        """
+        if not self._new or not self.path:
+            return
+        new = dict(self._new)  # snapshot: scraper thread may still add
+        merged = self._load()
+        merged.update(new)
+        folder = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(prefix=".desc_cache.", dir=folder)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(merged, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        for key in new:
+            self._new.pop(key, None)
+        self._data.update(merged)
@@ -0,0 +1,124 @@
+# import_profiler.py — opt-in cProfile + outbound HTTP timing for one import
+
+import os, re, json, time, uuid, cProfile, threading
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+import httpx
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+def profile_paths(profile_id: str) -> Optional[Dict[str, str]]:
+    """
+    Map a profile id to its files on disk; None if the id is malformed.
+      - pstats: cProfile dump (open with pstats, snakeviz, ...)
+      - http:   JSON with wall-clock timings of every outbound HTTP call
+    """
+    if not PROFILE_ID_RE.match(profile_id or ""):
+        return None
+    base = os.path.join(PROFILE_DIR, profile_id)
+    return {"pstats": f"{base}.prof", "http": f"{base}.http.json"}
+
+# ---------------------------
+# Profiler
+# ---------------------------
+class ImportProfile:
+    """
+    Context manager that profiles the current thread and records the wall-clock
+    time of every requests/httpx call made from it (image HEAD/GETs and
+    PostgREST calls). Files are written on exit; see profile_paths().
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.calls: List[Dict[str, Any]] = []
+        self._prof = cProfile.Profile()
+        self._owner = 0
+        self._orig_requests = requests.Session.request
+        self._orig_httpx = httpx.Client.send
+        self._started = 0.0
+
+    def _record(self, method: str, url: str, status: Optional[int], started: float):
+        u = urlparse(str(url))
+        self.calls.append({
+            "method": method.upper(),
+            "target": f"{u.netloc}{u.path}",
+            "status": status,
+            "offset_s": round(started - self._started, 6),
+            "seconds": round(time.perf_counter() - started, 6),
+        })
+
+    def _wrap_requests(self):
+        prof, orig = self, self._orig_requests
+
+        def request(session, method, url, *args, **kwargs):
+            if threading.get_ident() != prof._owner:
+                return orig(session, method, url, *args, **kwargs)
+            t0 = time.perf_counter()
+            status = None
+            try:
+                resp = orig(session, method, url, *args, **kwargs)
+                status = resp.status_code
+                return resp
+            finally:
+                prof._record(method, url, status, t0)
+        return request
+
+    def _wrap_httpx(self):
+        prof, orig = self, self._orig_httpx
+
+        def send(client, request, *args, **kwargs):
+            if threading.get_ident() != prof._owner:
+                return orig(client, request, *args, **kwargs)
+            t0 = time.perf_counter()
+            status = None
+            try:
+                resp = orig(client, request, *args, **kwargs)
+                status = resp.status_code
+                return resp
+            finally:
+                prof._record(request.method, request.url, status, t0)
+        return send
+
+    def __enter__(self):
+        self._owner = threading.get_ident()
+        self._started = time.perf_counter()
+        requests.Session.request = self._wrap_requests()
+        httpx.Client.send = self._wrap_httpx()
+        self._prof.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._prof.disable()
+        requests.Session.request = self._orig_requests
+        httpx.Client.send = self._orig_httpx
+        self.save(time.perf_counter() - self._started)
+        return False
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Aggregate HTTP wall-clock per 'METHOD host/path', slowest first."""
+        agg: Dict[str, Dict[str, float]] = {}
+        for c in self.calls:
+            key = f"{c['method']} {c['target']}"
+            a = agg.setdefault(key, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            a["count"] += 1
+            a["total_s"] = round(a["total_s"] + c["seconds"], 6)
+            a["max_s"] = max(a["max_s"], c["seconds"])
+        return dict(sorted(agg.items(), key=lambda kv: kv[1]["total_s"], reverse=True))
+
+    def save(self, wall_s: float):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        paths = profile_paths(self.id)
+        self._prof.dump_stats(paths["pstats"])
+        http_total = sum(c["seconds"] for c in self.calls)
+        with open(paths["http"], "w", encoding="utf-8") as f:
+            json.dump({
+                "profile_id": self.id,
+                "wall_s": round(wall_s, 6),
+                "http_total_s": round(http_total, 6),
+                "http_calls": len(self.calls),
+                "by_target": self.summary(),
+                "calls": self.calls,
+            }, f, indent=2)
@@ -0,0 +1,339 @@
+# loadtest.py — concurrent /bulk-import load test against an in-memory backend
+#
+#   python loadtest.py --uploads 4 --rows 200 --save-baseline baseline.json
+#   python loadtest.py --uploads 4 --rows 200 --baseline baseline.json
+#
+# Runs main.app under uvicorn in this process with the Supabase client swapped
+# for a local stand-in (in-memory tables + simulated round-trip latency) and a
+# local image server, so no real project or CDN is touched.
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import resource
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import httpx
+import uvicorn
+
+# ------------------ CLI ------------------
+def parse_args():
+    p = argparse.ArgumentParser(description="Load-test /bulk-import while probing /health.")
+    p.add_argument("--uploads", type=int, default=4, help="Concurrent /bulk-import uploads (default: 4)")
+    p.add_argument(
+        "--rows",
+        default="200",
+        help="Product rows per upload; comma-separated to mix sizes, e.g. 50,500 (default: 200)",
+    )
+    p.add_argument("--collections", type=int, default=10, help="Collections per upload (default: 10)")
+    p.add_argument("--db-latency", type=float, default=0.005, help="Simulated DB round-trip, seconds (default: 0.005)")
+    p.add_argument("--health-interval", type=float, default=0.05, help="Seconds between /health probes (default: 0.05)")
+    p.add_argument("--port", type=int, default=8765, help="Port for the app under test (default: 8765)")
+    p.add_argument("--out", help="Write this run's metrics to a JSON file")
+    p.add_argument("--save-baseline", help="Write this run's metrics as the baseline JSON")
+    p.add_argument("--baseline", help="Compare against a baseline JSON; exit 1 on regression")
+    p.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative regression vs baseline (default: 0.25 = 25%%)",
+    )
+    return p.parse_args()
+
+# ------------------ Stand-in backend ------------------
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+class _Query:
+    """Just enough of the postgrest query builder for bulk_import_lib."""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db, self.table = db, table
+        self.op = "select"
+        self.payload: Any = None
+        self.filters: List = []
+        self.max_rows: Optional[int] = None
+        self.one = False
+
+    def select(self, *_cols):
+        return self
+
+    def insert(self, payload):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def update(self, payload):
+        self.op, self.payload = "update", payload
+        return self
+
+    def eq(self, col, val):
+        self.filters.append(lambda r: r.get(col) == val)
+        return self
+
+    def in_(self, col, vals):
+        vals = set(vals)
+        self.filters.append(lambda r: r.get(col) in vals)
+        return self
+
+    def limit(self, n):
+        self.max_rows = n
+        return self
+
+    def single(self):
+        self.one = True
+        return self
+
+    def execute(self):
+        time.sleep(self.db.latency)  # blocking, like the real sync client
+        with self.db.lock:
+            self.db.calls += 1
+            rows = self.db.tables.setdefault(self.table, [])
+            if self.op == "insert":
+                new = self.payload if isinstance(self.payload, list) else [self.payload]
+                new = [{"id": uuid.uuid4().hex, **r} for r in new]
+                rows.extend(new)
+                return _Result(new)
+            hit = [r for r in rows if all(f(r) for f in self.filters)]
+            if self.op == "update":
+                for r in hit:
+                    r.update(self.payload)
+            if self.max_rows is not None:
+                hit = hit[:self.max_rows]
+            data = [dict(r) for r in hit]
+            if self.one:
+                if len(data) != 1:
+                    raise RuntimeError(f"single() on {self.table} matched {len(data)} rows")
+                return _Result(data[0])
+            return _Result(data)
+
+class FakeSupabase:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.calls = 0
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    def _ok(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._ok()
+
+    def do_GET(self):
+        self._ok()
+
+    def log_message(self, *_args):
+        pass
+
+# ------------------ Workload ------------------
+def make_csvs(tag: str, n_rows: int, n_collections: int, image_base: str):
+    cols = ["name,slug,image"]
+    for c in range(n_collections):
+        cols.append(f"Load Collection {c},load-collection-{c},{image_base}/collections/{c}.png")
+    prods = ["name,slug,price_inr,stock,collection_slugs,image"]
+    for i in range(n_rows):
+        prods.append(
+            f"Load {tag} Product {i},load-{tag}-product-{i},{100 + i},{i % 7},"
+            f"\"load-collection-{i % n_collections}\",{image_base}/products/{i % 50}.png"
+        )
+    return "\n".join(cols).encode(), "\n".join(prods).encode()
+
+def pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(q * (len(s) - 1))))]
+
+async def loop_lag_monitor(stop: threading.Event, out: List[float], interval: float = 0.01):
+    """Runs on the server's event loop; records how late each wake-up is."""
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        out.append(max(0.0, time.perf_counter() - t0 - interval))
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event, interval: float,
+                       lat: List[float], errors: List[str]):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            r = await client.get("/health")
+            if r.status_code != 200:
+                errors.append(f"/health -> {r.status_code}")
+        except Exception as e:
+            errors.append(f"/health: {e}")
+        lat.append(time.perf_counter() - t0)
+        await asyncio.sleep(interval)
+
+async def one_import(client: httpx.AsyncClient, tag: str, n_rows: int, args, image_base: str,
+                     durations: List[float], errors: List[str]):
+    c_csv, p_csv = make_csvs(tag, n_rows, args.collections, image_base)
+    t0 = time.perf_counter()
+    try:
+        r = await client.post(
+            "/bulk-import",
+            files={"collections": ("collections.csv", c_csv), "products": ("products.csv", p_csv)},
+            data={"dry_run": "false", "workers": "1", "profile": "false"},
+        )
+        body = r.json() if r.status_code == 200 else {}
+        if not body.get("ok"):
+            errors.append(f"import {tag}: status={r.status_code} logs={(body.get('logs') or [])[-1:]}")
+    except Exception as e:
+        errors.append(f"import {tag}: {e}")
+    durations.append(time.perf_counter() - t0)
+
+async def drive(args, sizes: List[int], image_base: str) -> Dict[str, Any]:
+    health_lat: List[float] = []
+    durations: List[float] = []
+    health_errors: List[str] = []
+    import_errors: List[str] = []
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=None) as client:
+        prober = asyncio.create_task(probe_health(client, stop, args.health_interval, health_lat, health_errors))
+        await asyncio.sleep(0.2)  # idle samples first
+        t0 = time.perf_counter()
+        await asyncio.gather(*[
+            one_import(client, f"u{i}", sizes[i % len(sizes)], args, image_base, durations, import_errors)
+            for i in range(args.uploads)
+        ])
+        wall = time.perf_counter() - t0
+        stop.set()
+        await prober
+
+    return {
+        "health_lat": health_lat, "durations": durations, "wall_s": wall,
+        "health_errors": health_errors, "import_errors": import_errors,
+    }
+
+# ------------------ Baseline ------------------
+# Metrics where larger is worse; absolute slack avoids flagging noise on tiny values
+COMPARED = {
+    "health_p95_ms": 5.0,
+    "health_max_ms": 10.0,
+    "loop_lag_p95_ms": 5.0,
+    "loop_lag_max_ms": 10.0,
+    "import_p50_s": 0.1,
+    "import_max_s": 0.1,
+    "mem_growth_mb": 2.0,
+    "error_rate": 0.0,
+}
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    for key, slack in COMPARED.items():
+        if key not in baseline:
+            continue
+        limit = baseline[key] * (1 + tolerance) + slack
+        flag = "REGRESSION" if current[key] > limit else "ok"
+        print(f"  {key:<16} {current[key]:>10.3f}  baseline {baseline[key]:>10.3f}  limit {limit:>10.3f}  {flag}")
+        if flag != "ok":
+            regressions.append(key)
+    return regressions
+
+# ------------------ MAIN ------------------
+def main():
+    args = parse_args()
+    sizes = [int(x) for x in str(args.rows).split(",") if x.strip()]
+
+    # main.py refuses to start without credentials; they are never used here.
+    os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1")
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "loadtest")
+    import main as app_main
+
+    fake = FakeSupabase(args.db_latency)
+    app_main.supabase = fake
+
+    images = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+    threading.Thread(target=images.serve_forever, daemon=True).start()
+    image_base = f"http://127.0.0.1:{images.server_address[1]}"
+
+    server = uvicorn.Server(uvicorn.Config(app_main.app, host="127.0.0.1", port=args.port,
+                                           log_level="warning", lifespan="off"))
+    server_loop = asyncio.new_event_loop()
+    t = threading.Thread(target=server_loop.run_until_complete, args=(server.serve(),), daemon=True)
+    t.start()
+    while not server.started:
+        if not t.is_alive():
+            sys.exit("!! app under test failed to start")
+        time.sleep(0.05)
+
+    lag: List[float] = []
+    lag_stop = threading.Event()
+    lag_task = asyncio.run_coroutine_threadsafe(loop_lag_monitor(lag_stop, lag), server_loop)
+
+    tracemalloc.start()
+    mem0, _ = tracemalloc.get_traced_memory()
+    rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(f"Running {args.uploads} concurrent upload(s), rows={sizes}, db_latency={args.db_latency}s ...")
+    run = asyncio.run(drive(args, sizes, image_base))
+
+    mem1, mem_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss1 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    lag_stop.set()
+    lag_task.result(timeout=5)
+    server.should_exit = True
+    t.join(timeout=10)
+    images.shutdown()
+
+    requests_total = len(run["health_lat"]) + args.uploads
+    errors_total = len(run["health_errors"]) + len(run["import_errors"])
+    metrics = {
+        "uploads": args.uploads,
+        "rows": sizes,
+        "db_latency_s": args.db_latency,
+        "db_calls": fake.calls,
+        "wall_s": round(run["wall_s"], 3),
+        "health_samples": len(run["health_lat"]),
+        "health_p50_ms": round(pct(run["health_lat"], 0.50) * 1000, 3),
+        "health_p95_ms": round(pct(run["health_lat"], 0.95) * 1000, 3),
+        "health_p99_ms": round(pct(run["health_lat"], 0.99) * 1000, 3),
+        "health_max_ms": round(max(run["health_lat"], default=0.0) * 1000, 3),
+        "loop_lag_p95_ms": round(pct(lag, 0.95) * 1000, 3),
+        "loop_lag_max_ms": round(max(lag, default=0.0) * 1000, 3),
+        "import_p50_s": round(pct(run["durations"], 0.50), 3),
+        "import_max_s": round(max(run["durations"], default=0.0), 3),
+        "mem_growth_mb": round((mem1 - mem0) / 1e6, 3),
+        "mem_peak_mb": round(mem_peak / 1e6, 3),
+        "rss_max_growth_mb": round((rss1 - rss0) / 1024, 3),  # ru_maxrss is KiB on Linux
+        "error_rate": round(errors_total / requests_total, 4) if requests_total else 0.0,
+        "errors": (run["import_errors"] + run["health_errors"])[:20],
+    }
+
+    print(json.dumps({k: v for k, v in metrics.items() if k != "errors"}, indent=2))
+    for e in metrics["errors"]:
+        print(f"  error: {e}")
+
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(metrics, f, indent=2)
+            print(f"Wrote {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+        regressions = compare(metrics, baseline, args.tolerance)
+        if regressions:
+            print(f"\n!! Regressed: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,27 @@
 # main.py
 import os
+from contextlib import nullcontext
 from typing import List, Optional
-from fastapi import FastAPI, File, UploadFile, Form
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse
 from dotenv import load_dotenv
 
 from bulk_import_lib import (
-    make_client, read_csv_bytes, ensure_collections, upsert_products
+    make_client, read_csv_bytes, ensure_collections, upsert_products,
+    upsert_products_parallel,
 )
+from import_profiler import ImportProfile, profile_paths
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 BUCKET_NAME = os.getenv("BUCKET_NAME", "product-images")
+# Default number of worker processes for product upserts (1 = in-process)
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "1") or 1)
+# Profile every import (otherwise only when the request sends profile=true)
+PROFILE_IMPORTS = os.getenv("BULK_IMPORT_PROFILE", "").lower() in ("1", "true", "yes", "y")
 
 if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
     raise SystemExit("Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY in .env")
@@ -38,34 +46,57 @@ async def bulk_import(
     collections: Optional[UploadFile] = File(None),
     products: Optional[UploadFile] = File(None),
     dry_run: str = Form("true"),
+    profile: str = Form("false"),
+    workers: str = Form(""),
 ):
     logs: List[str] = []
+    prof: Optional[ImportProfile] = None
     try:
         is_dry = dry_run.lower() in ("1", "true", "yes", "y")
+        n_workers = int(workers) if workers.strip() else IMPORT_WORKERS
+        want_profile = PROFILE_IMPORTS or profile.lower() in ("1", "true", "yes", "y")
         crows = []
         prows = []
 
-        if collections:
-            c_bytes = await collections.read()
-            crows = read_csv_bytes(c_bytes)
-            logs.append(f"collections rows: {len(crows)}")
+        # Read uploads before profiling starts so the profile covers only this import
+        c_bytes = await collections.read() if collections else None
+        p_bytes = await products.read() if products else None
 
-        if products:
-            p_bytes = await products.read()
-            prows = read_csv_bytes(p_bytes)
-            logs.append(f"products rows: {len(prows)}")
+        if want_profile:
+            prof = ImportProfile()
+            if n_workers > 1:
+                # Worker processes would run outside the profiler; keep it in-process
+                logs.append(f"[profile] workers={n_workers} ignored; profiling runs in-process")
+                n_workers = 1
 
-        coll_created = coll_updated = 0
-        prod_created = prod_updated = links = 0
+        with prof or nullcontext():
+            if c_bytes is not None:
+                crows = read_csv_bytes(c_bytes)
+                logs.append(f"collections rows: {len(crows)}")
 
-        if crows:
-            coll_created, coll_updated = ensure_collections(
-                supabase, BUCKET_NAME, SUPABASE_URL, crows, is_dry, logs
-            )
-        if prows:
-            prod_created, prod_updated, links = upsert_products(
-                supabase, BUCKET_NAME, SUPABASE_URL, prows, is_dry, logs
-            )
+            if p_bytes is not None:
+                prows = read_csv_bytes(p_bytes)
+                logs.append(f"products rows: {len(prows)}")
+
+            coll_created = coll_updated = 0
+            prod_created = prod_updated = links = 0
+
+            if crows:
+                coll_created, coll_updated = ensure_collections(
+                    supabase, BUCKET_NAME, SUPABASE_URL, crows, is_dry, logs
+                )
+            if prows and n_workers > 1:
+                prod_created, prod_updated, links = upsert_products_parallel(
+                    supabase, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, BUCKET_NAME,
+                    SUPABASE_URL, prows, is_dry, logs, n_workers
+                )
+            elif prows:
+                prod_created, prod_updated, links = upsert_products(
+                    supabase, BUCKET_NAME, SUPABASE_URL, prows, is_dry, logs
+                )
+
+        if prof:
+            logs.append(f"[profile] saved {prof.id} ({len(prof.calls)} HTTP calls); GET /profiles/{prof.id}")
 
         return {
             "ok": True,
@@ -75,7 +106,26 @@ async def bulk_import(
             "products_created": prod_created,
             "products_updated": prod_updated,
             "links_created": links,
+            "profile_id": prof.id if prof else None,
         }
     except Exception as e:
         logs.append(f"ERROR: {e}")
-        return {"ok": False, "logs": logs}
+        return {"ok": False, "logs": logs, "profile_id": prof.id if prof else None}
+
+@app.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    """Download the cProfile (pstats) dump of a profiled import."""
+    paths = profile_paths(profile_id)
+    if not paths or not os.path.exists(paths["pstats"]):
+        raise HTTPException(status_code=404, detail="profile not found")
+    return FileResponse(paths["pstats"], media_type="application/octet-stream",
+                        filename=f"bulk-import-{profile_id}.prof")
+
+@app.get("/profiles/{profile_id}/http")
+def get_profile_http(profile_id: str):
+    """Wall-clock timings of every outbound HTTP call made during a profiled import."""
+    paths = profile_paths(profile_id)
+    if not paths or not os.path.exists(paths["http"]):
+        raise HTTPException(status_code=404, detail="profile not found")
+    return FileResponse(paths["http"], media_type="application/json")
+
@@ -6,6 +6,8 @@ from urllib.parse import urlparse, urljoin
 import requests
 from bs4 import BeautifulSoup
 
+from desc_cache import DescriptionCache, clean_ws
+
 # ------------------ CONFIG ------------------
 CSV_DIR = "./csvs"              # your folder of input CSVs
 BASE    = "https://www.satvikstore.in"
@@ -18,17 +20,12 @@ HDRS = {
 TIMEOUT = 30
 PAUSE = 0.06  # be nice to their servers
 
-# ------------------ UTIL ------------------
-def clean_ws(s: str) -> str:
-    s = (s or "").strip()
-    s = re.sub(r"\s+", " ", s)
-    return s
+# Normalized descriptions keyed by hash of the raw HTML (persisted between runs)
+DESC_CACHE = DescriptionCache()
 
+# ------------------ UTIL ------------------
 def html_to_text(html: str) -> str:
-    soup = BeautifulSoup(str(html), "lxml")
-    for bad in soup.find_all(["script", "style", "noscript"]):
-        bad.decompose()
-    return clean_ws(soup.get_text(" ", strip=True))
+    return DESC_CACHE.html_to_text(html)
 
 def absolutize(u: str) -> str:
     if not u: return ""
@@ -168,6 +165,8 @@ def main():
         w.writeheader()
         w.writerows(results)
     print(f"\nWrote {len(results)} rows to {OUT_CSV}")
+    DESC_CACHE.save()
+    print(f"Description cache: {DESC_CACHE.stats()}")
 
 if __name__ == "__main__":
     main()
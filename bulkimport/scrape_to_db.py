@@ -0,0 +1,198 @@
+# scrape_to_db.py — scrape descriptions and stream them straight into Supabase
+import sys
+import csv
+import time
+import queue
+import argparse
+import threading
+from typing import Dict, List
+
+from supabase import Client
+
+from scarpe_descriptions import CSV_DIR, DESC_CACHE, PAUSE, read_all_rows, scrape_description
+from update import get_supabase, update_description
+
+_DONE = object()  # sentinel: producer finished
+
+# ------------------ CLI ------------------
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Scrape product descriptions and update products.description in Supabase "
+                    "while scraping continues (no intermediate CSV)."
+    )
+    p.add_argument("--csv-dir", default=CSV_DIR, help=f"Folder of input CSVs (default: {CSV_DIR})")
+    p.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="If set, overwrite existing non-empty descriptions (default: only fill empties).",
+    )
+    p.add_argument("--batch-size", type=int, default=25, help="Descriptions per DB batch (default: 25)")
+    p.add_argument(
+        "--queue-size",
+        type=int,
+        default=100,
+        help="Max scraped descriptions waiting for the DB writer (default: 100)",
+    )
+    p.add_argument(
+        "--flush-secs",
+        type=float,
+        default=5.0,
+        help="Flush a partial batch after this many idle seconds (default: 5.0)",
+    )
+    p.add_argument(
+        "--resume-csv",
+        default="scrape_to_db_unwritten.csv",
+        help="If the DB writer fails, unwritten descriptions are saved here for "
+             "`update.py --csv` (default: scrape_to_db_unwritten.csv)",
+    )
+    p.add_argument(
+        "--sleep",
+        type=float,
+        default=0.02,
+        help="Sleep between updates to avoid rate limits (default: 0.02s)",
+    )
+    return p.parse_args()
+
+# ------------------ Supabase (batched) ------------------
+def fetch_descriptions(sb: Client, slugs: List[str]) -> Dict[str, str]:
+    """Return slug -> current description for the slugs that exist in DB (one round-trip)."""
+    res = sb.table("products").select("slug,description").in_("slug", slugs).execute()
+    return {row["slug"]: (row.get("description") or "") for row in (res.data or [])}
+
+def write_batch(sb: Client, batch: List[Dict[str, str]], overwrite: bool,
+                sleep: float, stats: Dict[str, int]):
+    """Apply one batch with the same fill-empty / --overwrite rules as update.py."""
+    current = fetch_descriptions(sb, [r["slug"] for r in batch])
+    for r in batch:
+        slug, desc = r["slug"], r["description"]
+        if slug not in current:
+            print(f"  [db] {slug}: not found in DB -> missing")
+            stats["missing"] += 1
+            continue
+        if not overwrite and current[slug].strip():
+            print(f"  [db] {slug}: already has description -> skipped")
+            stats["skipped"] += 1
+            continue
+        if update_description(sb, slug, desc):
+            print(f"  [db] {slug}: updated ✓")
+            stats["updated"] += 1
+        else:
+            print(f"  [db] {slug}: update failed (RLS/constraint?) -> skipped")
+            stats["skipped"] += 1
+        time.sleep(sleep)
+
+# ------------------ PIPELINE ------------------
+def producer(slug_to_url: Dict[str, str], q: "queue.Queue", stats: Dict[str, int],
+             stop: threading.Event):
+    total = len(slug_to_url)
+    try:
+        for i, (slug, purl) in enumerate(sorted(slug_to_url.items())):
+            if stop.is_set():
+                break
+            try:
+                desc = scrape_description(slug, purl)
+                if desc:
+                    q.put({"slug": slug, "description": desc})  # blocks when the writer lags
+                    stats["scraped"] += 1
+                    print(f"[{i+1}/{total}] {slug} ✓  ({len(desc)} chars)")
+                else:
+                    stats["empty"] += 1
+                    print(f"[{i+1}/{total}] {slug} — no description found")
+            except Exception as e:
+                stats["errors"] += 1
+                print(f"[{i+1}/{total}] {slug} ERROR: {e}")
+            time.sleep(PAUSE)
+    finally:
+        q.put(_DONE)
+
+def consumer(sb: Client, q: "queue.Queue", args, stats: Dict[str, int],
+             batch: List[Dict[str, str]]):
+    """'batch' is owned by the caller so a failed batch can still be saved."""
+    while True:
+        try:
+            item = q.get(timeout=args.flush_secs)
+        except queue.Empty:
+            item = None  # idle: flush whatever we have
+
+        if item is not None and item is not _DONE:
+            batch.append(item)
+
+        if batch and (item is None or item is _DONE or len(batch) >= args.batch_size):
+            write_batch(sb, batch, args.overwrite, args.sleep, stats)
+            stats["batches"] += 1
+            batch.clear()
+
+        if item is _DONE:
+            return
+
+def drain(q: "queue.Queue", producer_thread: threading.Thread,
+          timeout: float = 90.0) -> List[Dict[str, str]]:
+    """
+    Collect everything still queued after a writer failure. The producer stops
+    at its next item but may still be finishing (and queueing) the current one.
+    """
+    out: List[Dict[str, str]] = []
+    deadline = time.time() + timeout
+    while True:
+        try:
+            item = q.get(timeout=0.5)
+        except queue.Empty:
+            if not producer_thread.is_alive() or time.time() > deadline:
+                return out
+            continue
+        if item is _DONE:
+            return out
+        out.append(item)
+
+def save_unwritten(path: str, rows: List[Dict[str, str]]):
+    """Same slug,description layout as descriptions_out.csv (what update.py reads)."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=["slug", "description"])
+        w.writeheader()
+        w.writerows(rows)
+
+# ------------------ MAIN ------------------
+def main():
+    args = parse_args()
+    sb = get_supabase()
+
+    slug_to_url = read_all_rows(args.csv_dir)
+    if not slug_to_url:
+        print(f"No products discovered in {args.csv_dir}. Check your CSVs & headers (need slug/handle or product_url/url).")
+        return
+
+    stats = {k: 0 for k in ("scraped", "empty", "errors", "batches", "updated", "skipped", "missing")}
+    q: "queue.Queue" = queue.Queue(maxsize=max(1, args.queue_size))
+    stop = threading.Event()
+    t = threading.Thread(target=producer, args=(slug_to_url, q, stats, stop), daemon=True)
+
+    started = time.time()
+    print(f"Scraping {len(slug_to_url)} products, writing in batches of {args.batch_size} ...\n")
+    t.start()
+    batch: List[Dict[str, str]] = []
+    try:
+        consumer(sb, q, args, stats, batch)
+    except Exception as e:
+        # Everything up to the last flushed batch is already in DB; keep the rest.
+        stop.set()
+        unwritten = batch + drain(q, t)
+        save_unwritten(args.resume_csv, unwritten)
+        DESC_CACHE.save()
+        print(f"\n!! DB writer failed: {e}", file=sys.stderr)
+        print(f"Saved {len(unwritten)} unwritten description(s) to {args.resume_csv}; "
+              f"resume with: python update.py --csv {args.resume_csv}", file=sys.stderr)
+        print(f"Summary (partial): {stats}", file=sys.stderr)
+        sys.exit(1)
+    t.join()
+    DESC_CACHE.save()
+
+    print("\nDone.")
+    print(
+        f"Summary: scraped={stats['scraped']}, no_desc={stats['empty']}, scrape_errors={stats['errors']}, "
+        f"updated={stats['updated']}, skipped={stats['skipped']}, missing={stats['missing']}, "
+        f"batches={stats['batches']}, elapsed={time.time() - started:.1f}s"
+    )
+    print(f"Description cache: {DESC_CACHE.stats()}")
+
+if __name__ == "__main__":
+    main()